@@ -4,28 +4,103 @@ Teams Operator - Creates Kubernetes namespaces when teams are created in the Tea
 """
 
 import asyncio
+import functools
 import json
 import logging
 import os
+import random
+import re
 import time
-from typing import Set, Dict, Any
+from typing import Dict, Any, Optional
 import aiohttp
+import orjson
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
 
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis is optional; without it every replica fetches from the API itself
+    aioredis = None
+
 # Configure logging
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger('teams-operator')
 
+# Runs of non-alphanumeric characters (underscore included) collapse to a single hyphen
+_NON_ALNUM_RUN = re.compile(r'[\W_]+')
+
+class TeamsFetchError(Exception):
+    """The Teams API could not be read - distinct from it returning no teams"""
+
+class RedisCache:
+    """Shared cache so only one operator replica per TTL window pays for GET /teams.
+
+    Eviction is left to the Redis server; run it with maxmemory-policy allkeys-lfu.
+    """
+    
+    def __init__(self, url: str):
+        self._redis = aioredis.from_url(url)
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry ({"body": {"teams", "etag"}, "fetched_at"}) or None on miss or error"""
+        try:
+            raw = await self._redis.get(key)
+            if raw is None:
+                return None
+            entry = orjson.loads(raw)
+            body = entry["body"]
+            if (
+                not isinstance(entry["fetched_at"], (int, float))
+                or not isinstance(body["teams"], list)
+                or not isinstance(body["etag"], (str, type(None)))
+            ):
+                raise ValueError("unexpected entry shape")
+            return entry
+        except Exception as e:
+            logger.warning("⚠️ Ignoring shared cache entry %s: %s", key, e)
+            return None
+    
+    async def set(self, key: str, body: Any, ttl: int):
+        """Store a timestamped entry that expires after ttl seconds"""
+        entry = {"body": body, "fetched_at": time.time()}
+        try:
+            await self._redis.set(key, orjson.dumps(entry), ex=max(ttl, 1))
+        except Exception as e:
+            logger.warning("⚠️ Redis set failed for %s: %s", key, e)
+    
+    async def close(self):
+        await self._redis.aclose()
+
 class TeamsOperator:
     def __init__(self):
         self.teams_api_url = os.getenv('TEAMS_API_URL', 'http://teams-api-service:80')
         self.poll_interval = int(os.getenv('POLL_INTERVAL', '30'))  # seconds
-        self.known_teams: Set[str] = set()
-        self.team_namespaces: Dict[str, str] = {}
+        # How long a fetched teams list counts as fresh; never shorter than a poll, or every poll would refetch
+        self.cache_ttl = max(int(os.getenv('CACHE_TTL', str(self.poll_interval * 2))), self.poll_interval)  # seconds
+        self.http_timeout = 10  # seconds, total per Teams API request
+        self.state_file = os.getenv('STATE_FILE', '/var/lib/teams-operator/state.json')
+        
+        # Stale-while-revalidate cache for the Teams API response
+        self._teams_cache: Dict[str, Any] = {"body": None, "fresh_until": 0, "stale_until": 0}
+        self._revalidate_task: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._last_etag: Optional[str] = None
+        self._reconciled_teams: Optional[list] = None
+        self._reconcile_lock = asyncio.Lock()
+        self._backoff = self.poll_interval
+        # While background refreshes are failing, don't start another before this (monotonic) time
+        self._revalidate_after = 0.0
+        
+        # Optional cache shared between replicas
+        self._shared_cache: Optional[RedisCache] = None
+        redis_url = os.getenv('REDIS_URL')
+        if redis_url and aioredis is None:
+            logger.warning("⚠️ REDIS_URL is set but the redis package is not installed, shared cache disabled")
+        elif redis_url:
+            self._shared_cache = RedisCache(redis_url)
         
         # Initialize Kubernetes client
         try:
@@ -37,14 +112,69 @@ class TeamsOperator:
             config.load_kube_config()
             logger.info("Loaded local kubeconfig")
         
-        self.k8s_core_v1 = client.CoreV1Api()
+        # Share one ApiClient with a larger urllib3 pool so namespace calls don't queue on a single connection
+        k8s_config = client.Configuration.get_default_copy()
+        k8s_config.connection_pool_maxsize = int(os.getenv('K8S_POOL_MAXSIZE', '50'))
+        client.Configuration.set_default(k8s_config)
+        
+        self.k8s_request_timeout = int(os.getenv('K8S_REQUEST_TIMEOUT', '10'))  # seconds
+        self.k8s_core_v1 = client.CoreV1Api(client.ApiClient(k8s_config))
+        
+        # Team ID -> namespace; its keys are the set of teams already reconciled
+        self.team_namespaces: Dict[str, str] = self.discover_team_namespaces()
+        
+    def discover_team_namespaces(self) -> Dict[str, str]:
+        """Rebuild the team -> namespace mapping from one labeled LIST, falling back to the state file"""
+        try:
+            namespaces = self.k8s_core_v1.list_namespace(
+                label_selector="app.kubernetes.io/managed-by=teams-operator",
+                _request_timeout=self.k8s_request_timeout
+            )
+        except Exception as e:
+            logger.warning("⚠️ Could not list managed namespaces, using saved state: %s", e)
+            return self.load_state()
         
-    def sanitize_namespace_name(self, team_name: str) -> str:
-        """Convert team name to valid Kubernetes namespace name"""
-        # Lowercase, replace spaces/special chars with hyphens, remove consecutive hyphens
-        namespace = team_name.lower()
-        namespace = ''.join(c if c.isalnum() else '-' for c in namespace)
-        namespace = '-'.join(filter(None, namespace.split('-')))  # Remove consecutive hyphens
+        team_namespaces = {
+            ns.metadata.labels["teams.example.com/team-id"]: ns.metadata.name
+            for ns in namespaces.items
+            if "teams.example.com/team-id" in (ns.metadata.labels or {})
+        }
+        logger.info("Discovered %d existing team namespaces", len(team_namespaces))
+        return team_namespaces
+    
+    def load_state(self) -> Dict[str, str]:
+        """Load the team -> namespace mapping persisted by a previous run"""
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+            if not isinstance(state, dict) or not all(
+                isinstance(k, str) and isinstance(v, str) for k, v in state.items()
+            ):
+                raise ValueError("expected a JSON object of team ID -> namespace strings")
+            logger.info("Loaded %d team namespaces from %s", len(state), self.state_file)
+            return state
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Could not load state from %s: %s", self.state_file, e)
+            return {}
+    
+    def save_state(self, team_namespaces: Dict[str, str]):
+        """Persist the team -> namespace mapping so a container restart doesn't re-create every namespace"""
+        tmp_path = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(team_namespaces, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            logger.warning("⚠️ Could not save state to %s: %s", self.state_file, e)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def sanitize_namespace_name(team_name: str) -> str:
+        """Convert team name to valid Kubernetes namespace name (memoized, names repeat across polls)"""
+        # Lowercase and replace each run of spaces/special chars with one hyphen in a single pass
+        namespace = _NON_ALNUM_RUN.sub('-', team_name.lower())
         
         # Ensure it starts and ends with alphanumeric
         namespace = namespace.strip('-')
@@ -59,23 +189,108 @@ class TeamsOperator:
         return namespace
     
     async def fetch_teams(self) -> list:
-        """Fetch current teams from the Teams API"""
+        """Fetch current teams, serving from cache while it is fresh or stale-but-revalidating.
+
+        Raises TeamsFetchError when the API can't be read, so a failure is never mistaken for "no teams".
+        """
+        now = time.monotonic()
+        cache = self._teams_cache
+        
+        if cache["body"] is not None and now < cache["fresh_until"]:
+            return cache["body"]
+        
+        if cache["body"] is not None and now < cache["stale_until"]:
+            # Serve the stale copy and refresh it in the background (unless backing off after a failure)
+            if self._revalidate_task is None and now >= self._revalidate_after:
+                self._revalidate_task = asyncio.create_task(self._revalidate_teams())
+            return cache["body"]
+        
+        return await self._request_teams()
+    
+    async def _revalidate_teams(self):
+        """Refresh the teams cache in the background, reconciling right away if the list changed"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.teams_api_url}/teams") as response:
-                    if response.status == 200:
-                        teams = await response.json()
-                        logger.debug(f"Fetched {len(teams)} teams from API")
-                        return teams
-                    else:
-                        logger.error(f"Failed to fetch teams: HTTP {response.status}")
-                        return []
+            previous = self._teams_cache["body"]
+            if await self._request_teams() is not previous:
+                await self.reconcile_teams()
+        except TeamsFetchError as e:
+            delay = self._next_backoff()
+            self._revalidate_after = time.monotonic() + delay
+            logger.warning("⚠️ Background refresh failed, serving cached teams (next try in %.1f seconds): %s", delay, e)
+        except Exception as e:
+            logger.error("❌ Error in background refresh: %s", e)
+        finally:
+            self._revalidate_task = None
+    
+    def _next_backoff(self) -> float:
+        """Return the current backoff with jitter and double it, capped at 5x the poll interval"""
+        delay = self._backoff + random.uniform(0, self._backoff * 0.1)
+        self._backoff = min(self._backoff * 2, self.poll_interval * 5)
+        return delay
+    
+    def _cache_teams(self, teams: list, age: float = 0.0):
+        """Mark the given teams list as fetched age seconds ago"""
+        self._revalidate_after = 0.0
+        fresh_until = time.monotonic() + self.cache_ttl - age
+        self._teams_cache = {
+            "body": teams,
+            "fresh_until": fresh_until,
+            "stale_until": fresh_until + 60,
+        }
+    
+    async def _request_teams(self) -> list:
+        """Fetch teams (shared cache first, then the Teams API) and update the cache"""
+        if self._shared_cache is not None:
+            entry = await self._shared_cache.get("teams:list")
+            if entry is not None:
+                body = entry["body"]
+                # Freshness counts from the original fetch, not from when this replica read it
+                age = min(max(time.time() - entry["fetched_at"], 0.0), self.cache_ttl)
+                # Keep our own list object when nothing changed so reconcile can short-circuit
+                if self._teams_cache["body"] is None or body["etag"] is None or body["etag"] != self._last_etag:
+                    self._last_etag = body["etag"]
+                    self._cache_teams(body["teams"], age)
+                else:
+                    self._cache_teams(self._teams_cache["body"], age)
+                logger.debug("Served teams from shared cache")
+                return self._teams_cache["body"]
+        
+        headers = {}
+        if self._last_etag and self._teams_cache["body"] is not None:
+            headers["If-None-Match"] = self._last_etag
+        
+        try:
+            async with self._session.get(f"{self.teams_api_url}/teams", headers=headers) as response:
+                if response.status == 304:
+                    # Unchanged since the last fetch - keep the cached list as-is
+                    teams = self._teams_cache["body"]
+                    logger.debug("Teams unchanged since last fetch (304)")
+                elif response.status == 200:
+                    teams = await response.json(loads=orjson.loads)
+                    self._last_etag = response.headers.get("ETag")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Fetched %d teams from API", len(teams))
+                else:
+                    raise TeamsFetchError(f"HTTP {response.status}")
+        except TeamsFetchError:
+            raise
+        except asyncio.TimeoutError as e:
+            # ClientTimeout expiry is a bare TimeoutError with an empty message
+            raise TeamsFetchError(f"timed out after {self.http_timeout}s reading Teams API") from e
         except aiohttp.ClientError as e:
-            logger.error(f"Error connecting to Teams API: {e}")
-            return []
+            raise TeamsFetchError(f"error connecting to Teams API: {e}") from e
         except Exception as e:
-            logger.error(f"Unexpected error fetching teams: {e}")
-            return []
+            raise TeamsFetchError(f"unexpected error: {e}") from e
+        
+        if not isinstance(teams, list):
+            raise TeamsFetchError(f"expected a list of teams, got {type(teams).__name__}")
+        
+        self._cache_teams(teams)
+        if self._shared_cache is not None:
+            await self._shared_cache.set(
+                "teams:list", {"teams": teams, "etag": self._last_etag}, ttl=self.cache_ttl
+            )
+        return teams
     
     def create_namespace(self, team_id: str, team_name: str, namespace_name: str) -> bool:
         """Create a Kubernetes namespace for the team"""
@@ -98,91 +313,126 @@ class TeamsOperator:
             )
             
             # Create the namespace
-            self.k8s_core_v1.create_namespace(body=namespace_body)
-            logger.info(f"✅ Created namespace '{namespace_name}' for team '{team_name}' (ID: {team_id})")
+            self.k8s_core_v1.create_namespace(body=namespace_body, _request_timeout=self.k8s_request_timeout)
+            logger.info("✅ Created namespace '%s' for team '%s' (ID: %s)", namespace_name, team_name, team_id)
             return True
             
         except ApiException as e:
             if e.status == 409:  # Namespace already exists
-                logger.warning(f"⚠️ Namespace '{namespace_name}' already exists")
+                logger.warning("⚠️ Namespace '%s' already exists", namespace_name)
                 return True
             else:
-                logger.error(f"❌ Failed to create namespace '{namespace_name}': {e}")
+                logger.error("❌ Failed to create namespace '%s': %s", namespace_name, e)
                 return False
         except Exception as e:
-            logger.error(f"❌ Unexpected error creating namespace: {e}")
+            logger.error("❌ Unexpected error creating namespace: %s", e)
             return False
     
     def delete_namespace(self, namespace_name: str, team_name: str) -> bool:
         """Delete a Kubernetes namespace when team is removed"""
         try:
-            self.k8s_core_v1.delete_namespace(name=namespace_name)
-            logger.info(f"🗑️ Deleted namespace '{namespace_name}' for removed team '{team_name}'")
+            self.k8s_core_v1.delete_namespace(name=namespace_name, _request_timeout=self.k8s_request_timeout)
+            logger.info("🗑️ Deleted namespace '%s' for removed team '%s'", namespace_name, team_name)
             return True
         except ApiException as e:
             if e.status == 404:  # Namespace doesn't exist
-                logger.warning(f"⚠️ Namespace '{namespace_name}' not found (already deleted?)")
+                logger.warning("⚠️ Namespace '%s' not found (already deleted?)", namespace_name)
                 return True
             else:
-                logger.error(f"❌ Failed to delete namespace '{namespace_name}': {e}")
+                logger.error("❌ Failed to delete namespace '%s': %s", namespace_name, e)
                 return False
         except Exception as e:
-            logger.error(f"❌ Unexpected error deleting namespace: {e}")
+            logger.error("❌ Unexpected error deleting namespace: %s", e)
             return False
     
     async def reconcile_teams(self):
         """Main reconciliation loop - sync teams with namespaces"""
-        teams = await self.fetch_teams()
-        current_teams = {team['id']: team for team in teams}
-        current_team_ids = set(current_teams.keys())
-        
-        # Handle new teams (create namespaces)
-        new_teams = current_team_ids - self.known_teams
-        for team_id in new_teams:
-            team = current_teams[team_id]
-            team_name = team['name']
-            namespace_name = self.sanitize_namespace_name(team_name)
+        # Serialized so a background refresh and the poll loop never diff the same state at once
+        async with self._reconcile_lock:
+            teams = await self.fetch_teams()
+            
+            # Same list object as last time means a cache hit or a 304 - nothing to do
+            if teams is self._reconciled_teams:
+                return
+            
+            # Cheap fast-path: same set of team IDs means no namespaces to create or delete
+            if frozenset(team['id'] for team in teams) == self.team_namespaces.keys():
+                self._reconciled_teams = teams
+                return
+            
+            current_teams = {team['id']: team for team in teams}
             
-            if self.create_namespace(team_id, team_name, namespace_name):
-                self.team_namespaces[team_id] = namespace_name
-        
-        # Handle deleted teams (remove namespaces)
-        deleted_teams = self.known_teams - current_team_ids
-        for team_id in deleted_teams:
-            if team_id in self.team_namespaces:
-                namespace_name = self.team_namespaces[team_id]
-                # Get team name from namespace annotations if possible
-                team_name = f"team-{team_id}"  # fallback
-                
-                if self.delete_namespace(namespace_name, team_name):
+            # Handle new teams (create namespaces concurrently off the event loop)
+            new_teams = list(current_teams.keys() - self.team_namespaces.keys())
+            new_namespaces = [self.sanitize_namespace_name(current_teams[team_id]['name']) for team_id in new_teams]
+            results = await asyncio.gather(*[
+                asyncio.to_thread(self.create_namespace, team_id, current_teams[team_id]['name'], namespace_name)
+                for team_id, namespace_name in zip(new_teams, new_namespaces)
+            ], return_exceptions=True)
+            for team_id, namespace_name, created in zip(new_teams, new_namespaces, results):
+                if created is True:
+                    self.team_namespaces[team_id] = namespace_name
+            
+            # Handle deleted teams (remove namespaces concurrently off the event loop)
+            deleted_teams = list(self.team_namespaces.keys() - current_teams.keys())
+            results = await asyncio.gather(*[
+                # Fall back to the team ID since the original name is no longer available
+                asyncio.to_thread(self.delete_namespace, self.team_namespaces[team_id], f"team-{team_id}")
+                for team_id in deleted_teams
+            ], return_exceptions=True)
+            for team_id, deleted in zip(deleted_teams, results):
+                if deleted is True:
                     del self.team_namespaces[team_id]
-        
-        # Update known teams
-        self.known_teams = current_team_ids
-        
-        if new_teams or deleted_teams:
-            logger.info(f"📊 Reconciliation complete: {len(current_teams)} teams, {len(self.team_namespaces)} namespaces")
+            
+            # Only remember this list as reconciled once every team has its namespace, so failures get retried
+            self._reconciled_teams = teams if self.team_namespaces.keys() == current_teams.keys() else None
+            
+            if new_teams or deleted_teams:
+                # Snapshot and write off the event loop
+                await asyncio.to_thread(self.save_state, dict(self.team_namespaces))
+                logger.info("📊 Reconciliation complete: %d teams, %d namespaces", len(current_teams), len(self.team_namespaces))
     
     async def run(self):
         """Main operator loop"""
-        logger.info(f"🚀 Teams Operator starting...")
-        logger.info(f"📡 Teams API URL: {self.teams_api_url}")
-        logger.info(f"⏰ Poll interval: {self.poll_interval} seconds")
-        
-        # Initial reconciliation
-        await self.reconcile_teams()
+        logger.info("🚀 Teams Operator starting...")
+        logger.info("📡 Teams API URL: %s", self.teams_api_url)
+        logger.info("⏰ Poll interval: %s seconds", self.poll_interval)
         
-        # Main loop
-        while True:
-            try:
-                await asyncio.sleep(self.poll_interval)
-                await self.reconcile_teams()
-            except KeyboardInterrupt:
-                logger.info("👋 Received shutdown signal, exiting...")
-                break
-            except Exception as e:
-                logger.error(f"❌ Error in main loop: {e}")
-                await asyncio.sleep(self.poll_interval)
+        # Long-lived HTTP session; fetches are up to cache_ttl + poll_interval apart, so keep the
+        # connection open that long (the Teams API's --timeout-keep-alive must be longer still)
+        connector = aiohttp.TCPConnector(limit=4, keepalive_timeout=self.cache_ttl + self.poll_interval)
+        timeout = aiohttp.ClientTimeout(total=self.http_timeout)
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as self._session:
+                # Reconcile immediately, then every poll interval; back off with jitter while the API is failing
+                delay = 0
+                while True:
+                    try:
+                        await asyncio.sleep(delay)
+                        await self.reconcile_teams()
+                        healthy = True
+                    except TeamsFetchError as e:
+                        # Keep every existing namespace; an unreachable API must not look like "all teams deleted"
+                        logger.error("❌ Failed to fetch teams, skipping reconciliation: %s", e)
+                        healthy = False
+                    except KeyboardInterrupt:
+                        logger.info("👋 Received shutdown signal, exiting...")
+                        break
+                    except Exception as e:
+                        logger.error("❌ Error in main loop: %s", e)
+                        healthy = False
+                    
+                    if healthy:
+                        # Serving stale data while background refreshes fail doesn't reset the backoff
+                        if not self._revalidate_after:
+                            self._backoff = self.poll_interval
+                        delay = self.poll_interval
+                    else:
+                        delay = self._next_backoff()
+                        logger.warning("⏳ Retrying in %.1f seconds", delay)
+        finally:
+            if self._shared_cache is not None:
+                await self._shared_cache.close()
 
 async def main():
     """Entry point"""
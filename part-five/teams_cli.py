@@ -6,42 +6,49 @@ Teams CLI - A simple command-line interface for the Teams API
 import argparse
 import json
 import sys
-import requests
-from typing import Optional
+import httpx
+from typing import Any, Optional
 
 API_BASE_URL = "http://localhost:8080"
 
 class TeamsAPI:
     def __init__(self, base_url: str = API_BASE_URL):
         self.base_url = base_url
+        # One client for the whole session so repeated calls reuse the keep-alive connection
+        self._client = httpx.Client(base_url=base_url, timeout=10.0)
         
-    def _make_request(self, method: str, endpoint: str, data: Optional[dict] = None) -> dict:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        """Close the underlying HTTP connection pool"""
+        self._client.close()
+        
+    def _make_request(self, method: str, endpoint: str, data: Optional[Any] = None) -> Any:
         """Make HTTP request to the API"""
-        url = f"{self.base_url}{endpoint}"
         try:
-            if method == "GET":
-                response = requests.get(url)
-            elif method == "POST":
-                response = requests.post(url, json=data, headers={"Content-Type": "application/json"})
-            elif method == "DELETE":
-                response = requests.delete(url)
-            else:
+            if method not in ("GET", "POST", "DELETE"):
                 raise ValueError(f"Unsupported method: {method}")
-                
+            
+            response = self._client.request(method, endpoint, json=data)
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.ConnectionError:
+        except httpx.TransportError:
             print(f"❌ Error: Could not connect to API at {self.base_url}")
             print("   Make sure the Teams API is running")
             sys.exit(1)
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 400:
-                error_detail = response.json().get("detail", "Bad request")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 400:
+                error_detail = e.response.json().get("detail", "Bad request")
+                print(f"❌ Error: {error_detail}")
+            elif e.response.status_code == 404:
+                error_detail = e.response.json().get("detail", "Team not found")
                 print(f"❌ Error: {error_detail}")
-            elif response.status_code == 404:
-                print("❌ Error: Team not found")
             else:
-                print(f"❌ HTTP Error {response.status_code}: {e}")
+                print(f"❌ HTTP Error {e.response.status_code}: {e}")
             sys.exit(1)
         except Exception as e:
             print(f"❌ Unexpected error: {e}")
@@ -62,6 +69,13 @@ class TeamsAPI:
         print(f"🆔 Team ID: {result['id']}")
         print(f"📅 Created: {result['created_at']}")
 
+    def create_teams(self, names: list):
+        """Create several teams in a single request"""
+        teams = self._make_request("POST", "/teams:batchCreate", [{"name": name} for name in names])
+        print(f"✅ Created {len(teams)} team(s):")
+        for team in teams:
+            print(f"🏷️  {team['name']} (🆔 {team['id']})")
+
     def list_teams(self):
         """List all teams"""
         teams = self._make_request("GET", "/teams")
@@ -89,6 +103,13 @@ class TeamsAPI:
         result = self._make_request("DELETE", f"/teams/{team_id}")
         print(f"✅ {result['message']}")
 
+    def delete_teams(self, team_ids: list):
+        """Delete several teams in a single request"""
+        result = self._make_request("POST", "/teams:batchDelete", team_ids)
+        print(f"✅ {result['message']}")
+        for name in result["deleted"]:
+            print(f"🗑️  {name}")
+
 def main():
     parser = argparse.ArgumentParser(
         description="Teams CLI - Manage teams via the Teams API",
@@ -97,9 +118,11 @@ def main():
 Examples:
   teams-cli health                    # Check API health
   teams-cli create "Backend Team"     # Create a new team
+  teams-cli create Backend Frontend   # Create several teams in one request
   teams-cli list                      # List all teams
   teams-cli get <team-id>            # Get specific team
   teams-cli delete <team-id>         # Delete a team
+  teams-cli delete <id-1> <id-2>     # Delete several teams in one request
         """
     )
     
@@ -115,8 +138,8 @@ Examples:
     subparsers.add_parser("health", help="Check API health")
     
     # Create command
-    create_parser = subparsers.add_parser("create", help="Create a new team")
-    create_parser.add_argument("name", help="Team name")
+    create_parser = subparsers.add_parser("create", help="Create one or more teams")
+    create_parser.add_argument("names", nargs="+", metavar="name", help="Team name(s)")
     
     # List command
     subparsers.add_parser("list", help="List all teams")
@@ -126,8 +149,8 @@ Examples:
     get_parser.add_argument("team_id", help="Team ID")
     
     # Delete command
-    delete_parser = subparsers.add_parser("delete", help="Delete a team")
-    delete_parser.add_argument("team_id", help="Team ID")
+    delete_parser = subparsers.add_parser("delete", help="Delete one or more teams")
+    delete_parser.add_argument("team_ids", nargs="+", metavar="team_id", help="Team ID(s)")
     
     args = parser.parse_args()
     
@@ -135,24 +158,28 @@ Examples:
         parser.print_help()
         return
     
-    # Initialize API client
-    api = TeamsAPI(args.url)
-    
-    # Execute command
-    try:
-        if args.command == "health":
-            api.health_check()
-        elif args.command == "create":
-            api.create_team(args.name)
-        elif args.command == "list":
-            api.list_teams()
-        elif args.command == "get":
-            api.get_team(args.team_id)
-        elif args.command == "delete":
-            api.delete_team(args.team_id)
-    except KeyboardInterrupt:
-        print("\n👋 Goodbye!")
-        sys.exit(0)
+    # Initialize API client and execute command
+    with TeamsAPI(args.url) as api:
+        try:
+            if args.command == "health":
+                api.health_check()
+            elif args.command == "create":
+                if len(args.names) == 1:
+                    api.create_team(args.names[0])
+                else:
+                    api.create_teams(args.names)
+            elif args.command == "list":
+                api.list_teams()
+            elif args.command == "get":
+                api.get_team(args.team_id)
+            elif args.command == "delete":
+                if len(args.team_ids) == 1:
+                    api.delete_team(args.team_ids[0])
+                else:
+                    api.delete_teams(args.team_ids)
+        except KeyboardInterrupt:
+            print("\n👋 Goodbye!")
+            sys.exit(0)
 
 if __name__ == "__main__":
     main()
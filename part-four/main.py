@@ -1,5 +1,6 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Dict
 import uuid
 from datetime import datetime
@@ -7,12 +8,10 @@ from datetime import datetime
 app = FastAPI(
     title="Teams API",
     description="A simple API for team leads to create and manage teams",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# In-memory storage
-teams_store: Dict[str, Dict] = {}
-
 # Pydantic models
 class TeamCreate(BaseModel):
     name: str
@@ -22,6 +21,30 @@ class Team(BaseModel):
     name: str
     created_at: datetime
 
+# Serializes the whole team list in one pass, without revalidating stored teams
+teams_list_adapter = TypeAdapter(List[Team])
+
+# In-memory storage (validated once on create, served as-is afterwards)
+teams_store: Dict[str, Team] = {}
+# Lowercased team name -> team ID, keeps the uniqueness check O(1)
+teams_by_lower_name: Dict[str, str] = {}
+# Bumped on every change to teams_store; the ETag for GET /teams is derived from it.
+# The per-process prefix keeps a restarted API from reusing an ETag for different data.
+_process_id = uuid.uuid4().hex[:8]
+teams_revision = 0
+
+# Cache hints for read-mostly endpoints; safe because GETs are idempotent and clients tolerate brief staleness
+TEAMS_CACHE_CONTROL = "public, max-age=5, stale-while-revalidate=60"
+HEALTH_CACHE_CONTROL = "max-age=1"
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison for If-None-Match (RFC 9110): accepts '*', lists and W/ validators"""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
 @app.get("/")
 async def root():
     return {"message": "Teams API is running"}
@@ -29,26 +52,82 @@ async def root():
 @app.post("/teams", response_model=Team)
 async def create_team(team: TeamCreate):
     """Create a new team"""
+    global teams_revision
     # Check if team name already exists
-    for existing_team in teams_store.values():
-        if existing_team["name"].lower() == team.name.lower():
-            raise HTTPException(status_code=400, detail="Team name already exists")
+    name_key = team.name.lower()
+    if name_key in teams_by_lower_name:
+        raise HTTPException(status_code=400, detail="Team name already exists")
 
     # Generate unique ID and create team
     team_id = str(uuid.uuid4())
-    new_team = {
-        "id": team_id,
-        "name": team.name,
-        "created_at": datetime.now()
-    }
+    new_team = Team(
+        id=team_id,
+        name=team.name,
+        created_at=datetime.now()
+    )
 
     teams_store[team_id] = new_team
-    return Team(**new_team)
+    teams_by_lower_name[name_key] = team_id
+    teams_revision += 1
+    return new_team
+
+@app.post("/teams:batchCreate", response_model=List[Team])
+async def batch_create_teams(teams: List[TeamCreate]):
+    """Create several teams in one request (all or nothing)"""
+    global teams_revision
+    if not teams:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one team")
 
-@app.get("/teams", response_model=List[Team])
-async def get_teams():
+    # Validate every name up front, including duplicates within the batch
+    name_keys = set()
+    for team in teams:
+        name_key = team.name.lower()
+        if name_key in teams_by_lower_name:
+            raise HTTPException(status_code=400, detail=f"Team name already exists: {team.name}")
+        if name_key in name_keys:
+            raise HTTPException(status_code=400, detail=f"Duplicate team name in batch: {team.name}")
+        name_keys.add(name_key)
+
+    created_at = datetime.now()
+    new_teams = [Team(id=str(uuid.uuid4()), name=team.name, created_at=created_at) for team in teams]
+    for new_team in new_teams:
+        teams_store[new_team.id] = new_team
+        teams_by_lower_name[new_team.name.lower()] = new_team.id
+    teams_revision += 1
+    return new_teams
+
+@app.post("/teams:batchDelete")
+async def batch_delete_teams(team_ids: List[str]):
+    """Delete several teams in one request (all or nothing)"""
+    global teams_revision
+    if not team_ids:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one team ID")
+
+    missing = [team_id for team_id in team_ids if team_id not in teams_store]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Teams not found: {', '.join(missing)}")
+
+    deleted_names = []
+    for team_id in dict.fromkeys(team_ids):
+        deleted_team = teams_store.pop(team_id)
+        teams_by_lower_name.pop(deleted_team.name.lower(), None)
+        deleted_names.append(deleted_team.name)
+    if deleted_names:
+        teams_revision += 1
+    return {"message": f"Deleted {len(deleted_names)} team(s) successfully", "deleted": deleted_names}
+
+@app.get("/teams", responses={200: {"model": List[Team]}})
+async def get_teams(request: Request):
     """Get all teams"""
-    return [Team(**team) for team in teams_store.values()]
+    etag = f'"{_process_id}-{teams_revision}"'
+    if etag_matches(request.headers.get("If-None-Match", ""), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": TEAMS_CACHE_CONTROL})
+
+    return Response(
+        teams_list_adapter.dump_json(list(teams_store.values())),
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": TEAMS_CACHE_CONTROL}
+    )
 
 @app.get("/teams/{team_id}", response_model=Team)
 async def get_team(team_id: str):
@@ -56,20 +135,24 @@ async def get_team(team_id: str):
     if team_id not in teams_store:
         raise HTTPException(status_code=404, detail="Team not found")
 
-    return Team(**teams_store[team_id])
+    return teams_store[team_id]
 
 @app.delete("/teams/{team_id}")
 async def delete_team(team_id: str):
     """Delete a team"""
+    global teams_revision
     if team_id not in teams_store:
         raise HTTPException(status_code=404, detail="Team not found")
 
     deleted_team = teams_store.pop(team_id)
-    return {"message": f"Team '{deleted_team['name']}' deleted successfully"}
+    teams_by_lower_name.pop(deleted_team.name.lower(), None)
+    teams_revision += 1
+    return {"message": f"Team '{deleted_team.name}' deleted successfully"}
 
 @app.get("/health")
-async def health_check():
+async def health_check(response: Response):
     """Health check endpoint for Kubernetes"""
+    response.headers["Cache-Control"] = HEALTH_CACHE_CONTROL
     return {"status": "healthy", "teams_count": len(teams_store)}
 
 if __name__ == "__main__":